@@ -0,0 +1,98 @@
+import itertools
+import os
+import traceback
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+
+from .replays.database import ReplayDatabase
+from .replays.parser import Replay
+
+REPLAYS_DIR = "data/zh"
+# Number of replays inserted per transaction
+COMMIT_BATCH_SIZE = 500
+# Number of replays parsed per worker task
+PARSE_CHUNK_SIZE = 32
+# Number of worker tasks queued in the parser pool at a time
+MAX_PENDING_CHUNKS = 64
+
+ParseResult = tuple[str, Replay | None, str | None]
+
+
+def iter_replay_paths(root: str) -> Iterator[str]:
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".rep"):
+                    yield entry.path
+
+
+def relative_replay_path(path: str) -> str:
+    return Path(os.path.relpath(path, REPLAYS_DIR)).as_posix()
+
+
+def parse_replay(path: str) -> ParseResult:
+    try:
+        return path, Replay(path), None
+    except Exception:
+        return path, None, traceback.format_exc()
+
+
+def parse_replay_chunk(paths: list[str]) -> list[ParseResult]:
+    return [parse_replay(path) for path in paths]
+
+
+def iter_chunks(paths: Iterator[str], size: int) -> Iterator[list[str]]:
+    while chunk := list(itertools.islice(paths, size)):
+        yield chunk
+
+
+def parse_replays(executor: Executor, paths: Iterator[str]) -> Iterator[ParseResult]:
+    # Executor.map() submits all of its input up front, so keep a bounded queue
+    # of chunks in flight instead and top it up as each chunk is collected
+    chunks = iter_chunks(paths, PARSE_CHUNK_SIZE)
+    pending = deque(
+        executor.submit(parse_replay_chunk, chunk)
+        for chunk in itertools.islice(chunks, MAX_PENDING_CHUNKS)
+    )
+    while pending:
+        results = pending.popleft().result()
+        if (chunk := next(chunks, None)) is not None:
+            pending.append(executor.submit(parse_replay_chunk, chunk))
+        yield from results
+
+
+def main() -> None:
+    db = ReplayDatabase(Path("replays.db"))
+    existing = db.existing_paths()
+    paths = (
+        path
+        for path in iter_replay_paths(REPLAYS_DIR)
+        if relative_replay_path(path) not in existing
+    )
+    with (
+        ProcessPoolExecutor() as executor,
+        open("failing.txt", "a", encoding="utf-8") as fail_log,
+    ):
+        results = parse_replays(executor, paths)
+        for i, (sample_path, replay, error) in enumerate(results, start=1):
+            print(f"{os.path.basename(sample_path)=}")
+            if replay is not None:
+                try:
+                    db.add_replay(replay, relative_replay_path(sample_path))
+                except Exception:
+                    error = traceback.format_exc()
+            if error is not None:
+                fail_log.write(f"- {sample_path}:\n")
+                fail_log.write(error)
+            if i % COMMIT_BATCH_SIZE == 0:
+                db.connection.commit()
+    db.connection.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,23 @@ if TYPE_CHECKING:
 
 
 class ReplayDatabase:
+    INSERT_REPLAY_SQL = "INSERT INTO replays(start_date, end_date, filename, version, build_date, version_major, version_minor, game_speed, mapfile, starting_credits) values(?, ?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING RETURNING id;"
+    INSERT_PATH_SQL = "INSERT OR IGNORE INTO replay_paths(path) values(?);"
+    INSERT_SLOT_SQL = "INSERT INTO slots(replay_id, type, human_name, user_id, computer_difficulty, color, faction, star_position, team) values(?, ?, ?, ?, ?, ?, ?, ?, ?);"
+
     def __init__(self, path: Path):
-        self.connection = sqlite3.connect(path)
+        self.connection = sqlite3.connect(path, cached_statements=256)
         self._setup()
 
     def _setup(self) -> None:
         self.connection.executescript(
             """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-65536;
+PRAGMA mmap_size=268435456;
+
 CREATE TABLE IF NOT EXISTS replays (
     id INTEGER PRIMARY KEY,
     start_date INTEGER,
@@ -39,18 +49,57 @@ CREATE TABLE IF NOT EXISTS slots (
     star_position INTEGER,
     team INTEGER
 );
+
+-- Paths of ingested replay files, relative to the replays directory
+CREATE TABLE IF NOT EXISTS replay_paths (
+    path TEXT PRIMARY KEY
+);
 """
         )
+        self._create_unique_index()
 
-    def add_replay(self, replay: "Replay") -> None:
-        # TODO: duplicate handling
-        (replay_id, *_) = self.connection.execute(
-            """
-INSERT INTO replays(start_date, end_date, filename, version, build_date, version_major, version_minor, game_speed, mapfile, starting_credits) values(?, ?, ?, ?, ?, ?, ?, ?, ?, ?) RETURNING id;
-""",
+    def _create_unique_index(self) -> None:
+        (has_unique_index,) = self.connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = 'idx_replays_file_start'"
+        ).fetchone()
+        if has_unique_index:
+            return
+        # Databases created before duplicate handling may hold the same replay
+        # more than once, so drop the extra copies in the same transaction
+        with self.connection:
+            self.connection.execute(
+                """
+DELETE FROM slots WHERE replay_id IN (
+    SELECT id FROM replays WHERE id NOT IN (
+        SELECT MIN(id) FROM replays GROUP BY filename, start_date
+    )
+);
+"""
+            )
+            self.connection.execute(
+                """
+DELETE FROM replays WHERE id NOT IN (
+    SELECT MIN(id) FROM replays GROUP BY filename, start_date
+);
+"""
+            )
+            self.connection.execute(
+                "CREATE UNIQUE INDEX idx_replays_file_start ON replays(filename, start_date);"
+            )
+
+    def existing_paths(self) -> set[str]:
+        return {
+            row[0]
+            for row in self.connection.execute("SELECT path FROM replay_paths")
+        }
+
+    def add_replay(self, replay: "Replay", path: str) -> None:
+        self.connection.execute(self.INSERT_PATH_SQL, (path,))
+        row = self.connection.execute(
+            self.INSERT_REPLAY_SQL,
             (
-                int(replay.start_date.timestamp()),
-                int(replay.end_date.timestamp()),
+                replay.start_date_ts,
+                replay.end_date_ts,
                 replay.path.name,
                 replay.version,
                 replay.build_date,
@@ -61,12 +110,14 @@ INSERT INTO replays(start_date, end_date, filename, version, build_date, version
                 replay.metadata.starting_credits,
             ),
         ).fetchone()
+        if row is None:
+            print(f"already ingested: {path=}")
+            return
+        (replay_id, *_) = row
         print(f"{replay_id=}")
-        for slot in replay.metadata.slots:
-            if not slot.slot_type.value:
-                continue
-            self.connection.execute(
-                "INSERT INTO slots(replay_id, type, human_name, user_id, computer_difficulty, color, faction, star_position, team) values(?, ?, ?, ?, ?, ?, ?, ?, ?);",
+        self.connection.executemany(
+            self.INSERT_SLOT_SQL,
+            [
                 (
                     replay_id,
                     slot.slot_type.value,
@@ -77,5 +128,8 @@ INSERT INTO replays(start_date, end_date, filename, version, build_date, version
                     slot.faction,
                     slot.star_position,
                     slot.team,
-                ),
-            )
+                )
+                for slot in replay.metadata.slots
+                if slot.slot_type.value
+            ],
+        )
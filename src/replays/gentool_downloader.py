@@ -11,8 +11,11 @@ from typing import Any
 
 import scrapy
 import scrapy.http
+from scrapy.linkextractors import LinkExtractor
+from twisted.python.failure import Failure
 
 WINDOWS_DISALLOWED_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+DOWNLOADED_EXTENSIONS = (".rep", ".txt")
 
 
 def strip_invalid_chars(filename: str) -> str:
@@ -21,6 +24,10 @@ def strip_invalid_chars(filename: str) -> str:
 
 class GentoolSpider(scrapy.Spider):
     name = "gentool"
+    link_extractor = LinkExtractor(
+        allow=(r"\.rep$", r"\.txt$", r"/$"),
+        deny_extensions=(),
+    )
 
     def __init__(
         self,
@@ -30,10 +37,29 @@ class GentoolSpider(scrapy.Spider):
         **kwargs: Any,
     ):
         super().__init__(name, **kwargs)
-        self.start_urls = [f"https://www.gentool.net/data/{subpath}"]
         path_parts = [p for p in subpath.split("/") if p]
+        url_path = "/".join(path_parts)
+        if path_parts and path_parts[-1].endswith(DOWNLOADED_EXTENSIONS):
+            # A single file is saved into its parent directory
+            path_parts.pop()
+        elif path_parts:
+            # Directory URLs without a trailing slash are redirected, which we don't follow
+            url_path += "/"
+        self.start_urls = [f"https://www.gentool.net/data/{url_path}"]
         self.outdir = Path(outdir).joinpath(*path_parts)
 
+    def start_requests(self):
+        for url in self.start_urls:
+            yield scrapy.Request(url, dont_filter=True, errback=self.on_error)
+
+    def on_error(self, failure: Failure) -> None:
+        # Log failed URLs so a later run can target them with `subpath`
+        self.logger.error(
+            "Failed to download %s: %r",
+            failure.request.url,  # type: ignore[attr-defined]
+            failure.value,
+        )
+
     def parse(
         self,
         response: scrapy.http.Response,
@@ -46,19 +72,15 @@ class GentoolSpider(scrapy.Spider):
             file_path = outdir / str(response.url.split("/")[-1])
             file_path.write_bytes(response.body)
             return
-        rows = response.css("tr")[3:-1]
-        for row in rows:
-            link = next(iter(row.css("a")), None)
-            if not link:
+        for link in self.link_extractor.extract_links(response):
+            sub_url = link.url
+            # Skip links to the current or parent directory
+            if not sub_url.startswith(response.url) or sub_url == response.url:
                 continue
-            sub_url = response.urljoin(link.attrib["href"])
-            name = link.css("*::text").get()
             if sub_url.endswith("/"):
-                subpath = outdir / strip_invalid_chars(name)
+                subpath = outdir / strip_invalid_chars(link.text)
             else:
                 subpath = outdir
-                if not any(sub_url.endswith(s) for s in (".rep", ".txt")):
-                    continue
                 file_path = subpath / str(sub_url.split("/")[-1])
                 if file_path.exists():
                     continue
@@ -66,6 +88,7 @@ class GentoolSpider(scrapy.Spider):
                 sub_url,
                 self.parse,
                 cb_kwargs={"outdir": subpath},
+                errback=self.on_error,
             )
 
     @classmethod
@@ -74,3 +97,16 @@ class GentoolSpider(scrapy.Spider):
         settings.set("CONCURRENT_REQUESTS", 100, priority="spider")
         settings.set("REACTOR_THREADPOOL_MAXSIZE", 20, priority="spider")
         settings.set("COOKIES_ENABLED", False, priority="spider")
+        settings.set("CONCURRENT_REQUESTS_PER_DOMAIN", 50, priority="spider")
+        settings.set(
+            "SCHEDULER_PRIORITY_QUEUE",
+            "scrapy.pqueues.DownloaderAwarePriorityQueue",
+            priority="spider",
+        )
+        settings.set(
+            "TWISTED_REACTOR",
+            "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+            priority="spider",
+        )
+        settings.set("RETRY_TIMES", 1, priority="spider")
+        settings.set("REDIRECT_ENABLED", False, priority="spider")
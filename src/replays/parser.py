@@ -9,36 +9,48 @@ from __future__ import annotations
 import dataclasses
 import datetime
 import enum
+import re
 import struct
 from dataclasses import dataclass
 from pathlib import Path
-from typing import BinaryIO
+from typing import Callable
 
+_U16_UNPACK = struct.Struct("<H").unpack_from
+_U32_UNPACK = struct.Struct("<I").unpack_from
+_U32U32_UNPACK = struct.Struct("<II").unpack_from
+_TIMESTAMP_UNPACK = struct.Struct("<8H").unpack_from
 
-def read_uint16(file: BinaryIO) -> int:
-    return struct.unpack("<H", file.read(2))[0]
 
+def read_uint16(buf: bytes, off: int) -> tuple[int, int]:
+    return _U16_UNPACK(buf, off)[0], off + 2
 
-def read_uint32(file: BinaryIO) -> int:
-    return struct.unpack("<I", file.read(4))[0]
 
+def read_uint32(buf: bytes, off: int) -> tuple[int, int]:
+    return _U32_UNPACK(buf, off)[0], off + 4
 
-def read_null_terminated_string(file: BinaryIO) -> str:
-    chars = []
-    while c := file.read(1):
-        if c == b"\x00":
-            break
-        chars.append(c)
-    return b"".join(chars).decode()
+
+def read_bytes(buf: bytes, off: int, size: int) -> tuple[bytes, int]:
+    return buf[off : off + size], off + size
+
+
+def read_null_terminated_string(buf: bytes, off: int) -> tuple[str, int]:
+    end = buf.find(b"\x00", off)
+    if end == -1:
+        raise ReplayParserException("unterminated string")
+    return buf[off:end].decode(), end + 1
 
 
-def read_null_terminated_utf16_string(file: BinaryIO) -> str:
-    chars = []
-    while c := file.read(2):
-        if c == b"\x00\x00":
+def read_null_terminated_utf16_string(buf: bytes, off: int) -> tuple[str, int]:
+    end = off
+    while True:
+        end = buf.find(b"\x00\x00", end)
+        if end == -1:
+            raise ReplayParserException("unterminated UTF-16 string")
+        # Skip null pairs straddling two code units (e.g. "\x01\x00\x00\x01")
+        if (end - off) % 2 == 0:
             break
-        chars.append(c)
-    return b"".join(chars).decode(encoding="utf_16")
+        end += 1
+    return buf[off:end].decode(encoding="utf_16_le"), end + 2
 
 
 class ReplayParserException(Exception):
@@ -51,7 +63,7 @@ class GameType(enum.Enum):
     BFME2 = enum.auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class ReplayTimestamp:
     year: int
     month: int
@@ -63,17 +75,8 @@ class ReplayTimestamp:
     millisecond: int
 
     @classmethod
-    def parse(cls, file: BinaryIO) -> ReplayTimestamp:
-        return cls(
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-            read_uint16(file),
-        )
+    def parse(cls, buf: bytes, off: int) -> tuple[ReplayTimestamp, int]:
+        return cls(*_TIMESTAMP_UNPACK(buf, off)), off + 16
 
 
 class ReplaySlotType(enum.Enum):
@@ -88,7 +91,21 @@ class ReplaySlotDifficulty(enum.Enum):
     HARD = 3
 
 
-@dataclass
+_SLOT_TYPES = {
+    "H": ReplaySlotType.HUMAN,
+    "C": ReplaySlotType.COMPUTER,
+    "X": ReplaySlotType.EMPTY,
+    "O": ReplaySlotType.EMPTY,
+}
+
+_SLOT_DIFFICULTIES = {
+    "E": ReplaySlotDifficulty.EASY,
+    "M": ReplaySlotDifficulty.MEDIUM,
+    "H": ReplaySlotDifficulty.HARD,
+}
+
+
+@dataclass(slots=True)
 class ReplaySlot:
     slot_type: ReplaySlotType
     human_name: str = ""
@@ -107,7 +124,7 @@ class ReplaySlot:
         slot_details = [p for p in raw.split(",") if p]
         if slot_type == ReplaySlotType.HUMAN:
             slot.human_name = slot_details[0][1:]
-            slot.user_id = int(slot_details[1], base=16)
+            slot.user_id = int(slot_details[1], 16)
             slot.color = int(slot_details[4])
             slot.faction = int(slot_details[5])
             slot.star_position = int(slot_details[6])
@@ -123,30 +140,20 @@ class ReplaySlot:
 
     @staticmethod
     def _read_slot_type(raw: str) -> ReplaySlotType:
-        c = raw[0]
-        if c == "H":
-            return ReplaySlotType.HUMAN
-        if c == "C":
-            return ReplaySlotType.COMPUTER
-        if c == "C":
-            return ReplaySlotType.COMPUTER
-        if c in ("X", "O"):
-            return ReplaySlotType.EMPTY
-        raise ReplayParserException(f"invalid replay slot type: {raw[0]}")
+        slot_type = _SLOT_TYPES.get(raw[0])
+        if slot_type is None:
+            raise ReplayParserException(f"invalid replay slot type: {raw[0]}")
+        return slot_type
 
     @staticmethod
     def _read_slot_difficulty(raw: str) -> ReplaySlotDifficulty:
-        c = raw[1]
-        if c == "E":
-            return ReplaySlotDifficulty.EASY
-        if c == "M":
-            return ReplaySlotDifficulty.EASY
-        if c == "H":
-            return ReplaySlotDifficulty.EASY
-        raise ReplayParserException(f"invalid replay slot difficulty: {raw[0]}")
+        difficulty = _SLOT_DIFFICULTIES.get(raw[1])
+        if difficulty is None:
+            raise ReplayParserException(f"invalid replay slot difficulty: {raw[1]}")
+        return difficulty
 
 
-@dataclass
+@dataclass(slots=True)
 class ReplayMetadata:
     mapfile_unknown_int: int = 0
     mapfile: str = ""
@@ -160,88 +167,120 @@ class ReplayMetadata:
     slots: list[ReplaySlot] = dataclasses.field(default_factory=list)
 
     @classmethod
-    def parse(cls, file: BinaryIO) -> ReplayMetadata:
+    def parse(cls, buf: bytes, off: int) -> tuple[ReplayMetadata, int]:
         metadata = ReplayMetadata()
-        raw = read_null_terminated_string(file)
+        raw, off = read_null_terminated_string(buf, off)
         raw_split = [p for p in raw.split(";") if p]
         for entry in raw_split:
             key, value = entry.split("=", maxsplit=1)
-            if key == "US":
-                pass
-            elif key == "M":
-                int_end = 0
-                for c in value:
-                    if not ("9" >= c >= "0"):
-                        break
-                    int_end += 1
-                metadata.mapfile_unknown_int = int(value[:int_end])
-                metadata.mapfile = value[int_end:]
-            elif key == "MC":
-                metadata.map_crc = int(value, base=16)
-            elif key == "MS":
-                metadata.map_size = int(value)
-            elif key == "SD":
-                metadata.SD = int(value)
-            elif key == "C":
-                metadata.C = int(value)
-            elif key == "SR":
-                metadata.SR = int(value)
-            elif key == "SC":
-                metadata.starting_credits = int(value)
-            elif key == "O":
-                metadata.O = value
-            elif key == "S":
-                for slot_raw in value.split(":"):
-                    if not slot_raw:
-                        continue
-                    metadata.slots.append(ReplaySlot.parse(slot_raw))
-            else:
+            handler = _METADATA_HANDLERS.get(key)
+            if handler is None:
                 raise ReplayParserException(f"Unexpected replay metadata key: {key}")
+            handler(metadata, value)
+
+        return metadata, off
+
+
+_MAPFILE_RE = re.compile(r"([0-9]+)(.*)", re.DOTALL)
+
+
+def _parse_metadata_mapfile(metadata: ReplayMetadata, value: str) -> None:
+    match = _MAPFILE_RE.match(value)
+    if not match:
+        raise ReplayParserException(f"invalid replay map file: {value}")
+    metadata.mapfile_unknown_int = int(match.group(1))
+    metadata.mapfile = match.group(2)
+
+
+def _parse_metadata_slots(metadata: ReplayMetadata, value: str) -> None:
+    for slot_raw in value.split(":"):
+        if not slot_raw:
+            continue
+        metadata.slots.append(ReplaySlot.parse(slot_raw))
+
 
-        return metadata
+def _set_int_field(name: str) -> Callable[[ReplayMetadata, str], None]:
+    def handler(metadata: ReplayMetadata, value: str) -> None:
+        setattr(metadata, name, int(value))
+
+    return handler
+
+
+def _set_str_field(name: str) -> Callable[[ReplayMetadata, str], None]:
+    def handler(metadata: ReplayMetadata, value: str) -> None:
+        setattr(metadata, name, value)
+
+    return handler
+
+
+def _set_hex_field(name: str) -> Callable[[ReplayMetadata, str], None]:
+    def handler(metadata: ReplayMetadata, value: str) -> None:
+        setattr(metadata, name, int(value, 16))
+
+    return handler
+
+
+def _ignore_field(metadata: ReplayMetadata, value: str) -> None:
+    pass
+
+
+_METADATA_HANDLERS: dict[str, Callable[[ReplayMetadata, str], None]] = {
+    "US": _ignore_field,
+    "M": _parse_metadata_mapfile,
+    "MC": _set_hex_field("map_crc"),
+    "MS": _set_int_field("map_size"),
+    "SD": _set_int_field("SD"),
+    "C": _set_int_field("C"),
+    "SR": _set_int_field("SR"),
+    "SC": _set_int_field("starting_credits"),
+    "O": _set_str_field("O"),
+    "S": _parse_metadata_slots,
+}
 
 
 class Replay:
     def __init__(self, path: str | Path):
         self.path = Path(path)
-        with open(self.path, "rb") as file:
-            self._parse(file)
+        self._parse(self.path.read_bytes())
+
+    @property
+    def start_date(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.start_date_ts)
+
+    @property
+    def end_date(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.end_date_ts)
 
-    def _parse(self, file: BinaryIO) -> None:
-        self.game_type = self._parse_game_type(file)
+    def _parse(self, buf: bytes) -> None:
+        self.game_type, off = self._parse_game_type(buf, 0)
         if self.game_type != GameType.GENERALS:
             raise ReplayParserException(
                 f"parsing for game type {self.game_type.name} not implemented yet"
             )
-        self.start_date = self._parse_timestamp(file)
-        self.end_date = self._parse_timestamp(file)
-        self.num_timecodes = read_uint16(file)
-        _zero = file.read(12)
-        self.filename = read_null_terminated_utf16_string(file)
-        self.timestamp = ReplayTimestamp.parse(file)
-        self.version = read_null_terminated_utf16_string(file)
-        self.build_date = read_null_terminated_utf16_string(file)
-        self.version_minor = read_uint16(file)
-        self.version_major = read_uint16(file)
-        self.unknown_hash = file.read(8)
-        self.metadata = ReplayMetadata.parse(file)
-        self.unknown1 = read_uint16(file)
-        self.unknown2 = read_uint32(file)
-        self.unknown3 = read_uint32(file)
-        self.unknown4 = read_uint32(file)
-        self.game_speed = read_uint32(file)
-
-    def _parse_game_type(self, file: BinaryIO) -> GameType:
-        game_type = file.read(6).decode()
-        if game_type == "GENREP":
-            return GameType.GENERALS
-        game_type = file.read(6).decode()
-        if game_type == "BFMEREPL":
-            return GameType.BFME
-        elif game_type == "BFME2RPL":
-            return GameType.BFME2
-        raise ReplayParserException(f"Unrecognized replay type: {game_type}")
-
-    def _parse_timestamp(self, file: BinaryIO) -> datetime.datetime:
-        timestamp = read_uint32(file)
-        return datetime.datetime.fromtimestamp(timestamp)
+        self.start_date_ts, self.end_date_ts = _U32U32_UNPACK(buf, off)
+        off += 8
+        self.num_timecodes, off = read_uint16(buf, off)
+        _zero, off = read_bytes(buf, off, 12)
+        self.filename, off = read_null_terminated_utf16_string(buf, off)
+        self.timestamp, off = ReplayTimestamp.parse(buf, off)
+        self.version, off = read_null_terminated_utf16_string(buf, off)
+        self.build_date, off = read_null_terminated_utf16_string(buf, off)
+        self.version_minor, off = read_uint16(buf, off)
+        self.version_major, off = read_uint16(buf, off)
+        self.unknown_hash, off = read_bytes(buf, off, 8)
+        self.metadata, off = ReplayMetadata.parse(buf, off)
+        self.unknown1, off = read_uint16(buf, off)
+        self.unknown2, off = read_uint32(buf, off)
+        self.unknown3, off = read_uint32(buf, off)
+        self.unknown4, off = read_uint32(buf, off)
+        self.game_speed, off = read_uint32(buf, off)
+
+    def _parse_game_type(self, buf: bytes, off: int) -> tuple[GameType, int]:
+        if buf[off : off + 6] == b"GENREP":
+            return GameType.GENERALS, off + 6
+        game_type = buf[off : off + 8]
+        if game_type == b"BFMEREPL":
+            return GameType.BFME, off + 8
+        elif game_type == b"BFME2RPL":
+            return GameType.BFME2, off + 8
+        raise ReplayParserException(f"Unrecognized replay type: {game_type!r}")